@@ -15,19 +15,56 @@ ASSUMPTIONS:
 - Empty or whitespace-only doc-numbers are skipped
 - Document order is preserved within each priority group
 - Duplicates are not removed
-- Input can be a file path or XML string (detected by checking if file exists or starts with '<')
-- Files are UTF-8 encoded
+- Input can be a file path, XML string or XML bytes (strings detected by checking if they start with '<')
+- Documents are streamed, so only one <document-id> subtree is held in memory at a time
+- Files and bytes are decoded by the parser itself: UTF-8 unless the XML declaration says otherwise
+- lxml is used for parsing when installed, otherwise the standard library ElementTree
 """
 
+import io
 import logging
-import xml.etree.ElementTree as ET
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    from lxml import etree as ET
+    # lxml < 5 can't limit entity expansion to internal entities (it reads
+    # resolve_entities as a plain bool), so use the stdlib parser instead
+    if ET.LXML_VERSION < (5, 0):
+        raise ImportError("lxml >= 5.0 required")
+    HAS_LXML = True
+except ImportError:
+    try:
+        # Older interpreters only expose the C accelerator under this name
+        import xml.etree.cElementTree as ET
+    except ImportError:
+        import xml.etree.ElementTree as ET
+    HAS_LXML = False
 
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# ElementTree keeps its pure-Python Element as _Element_Py; if that is still
+# the active Element, the _elementtree C accelerator is missing
+if not HAS_LXML and ET.Element is getattr(sys.modules['xml.etree.ElementTree'], '_Element_Py', None):
+    logger.warning("lxml and the _elementtree C accelerator are unavailable, "
+                   "falling back to the slow pure-Python XML parser")
+
+# Inline XML is detected by its first non-whitespace character, without
+# scanning (or copying) the rest of a potentially large string
+_XML_START = re.compile(r'\s*<')
+
+# Read files in 1 MiB chunks so the parser consumes large files incrementally
+READ_BUFFER_SIZE = 1 << 20
+
+# Number of documents sent to a worker process at a time by extract_doc_numbers_many
+MANY_CHUNK_SIZE = 32
+
 
 class XMLParsingError(Exception):
     """Raised when XML cannot be parsed."""
@@ -42,18 +79,20 @@ class FileNotFound(Exception):
     """Raised when file cannot be read."""
     pass
 
-def _get_priority(format_attr: str, load_source_attr: str) -> int:
+def _get_priority(format_attr: Optional[str], load_source_attr: Optional[str]) -> int:
     """
     Determine priority based on format and load-source attributes.
 
+    Attributes that are missing are passed as None. Matching is case-insensitive.
+
     Returns:
         1: format="epo" AND load-source="patent-office"
         2: format="epo" only
         3: load-source="patent-office" only
         4: everything else
     """
-    has_epo = format_attr == "epo"
-    has_patent_office = load_source_attr == "patent-office"
+    has_epo = format_attr is not None and format_attr.lower() == "epo"
+    has_patent_office = load_source_attr is not None and load_source_attr.lower() == "patent-office"
 
     if has_epo and has_patent_office:
         return 1
@@ -65,12 +104,146 @@ def _get_priority(format_attr: str, load_source_attr: str) -> int:
         return 4
 
 
-def extract_doc_numbers(source: Union[str, Path]) -> List[str]:
+# Priorities keyed on the raw (format, load-source) pair. Real feeds reuse a
+# handful of combinations, so after seeding nearly every lookup is a hit.
+_PRIORITY_CACHE: Dict[Tuple[Optional[str], Optional[str]], int] = {
+    (format_attr, load_source_attr): _get_priority(format_attr, load_source_attr)
+    for format_attr in ('epo', 'original', 'docdb', None)
+    for load_source_attr in ('patent-office', 'docdb', 'original', None)
+}
+# Stop memoizing unseen pairs past this size so odd inputs can't grow it unbounded
+_PRIORITY_CACHE_MAX_SIZE = 1024
+
+# Under lxml, fetch doc-number text with one precompiled XPath call instead of
+# find() + .text. Only a leading text node matches, as with .text. Plain
+# strings, because lxml's "smart" results keep a reference to their element
+# and would stop streamed elements being freed.
+if HAS_LXML:
+    _DOC_NUMBER_TEXT = ET.XPath('doc-number[1]/node()[1][self::text()]', smart_strings=False)
+else:
+    _DOC_NUMBER_TEXT = None
+
+
+def _iter_document_ids(stream: BinaryIO, encoding: Optional[str] = None) -> Iterator:
+    """
+    Stream <document-id> elements from a binary XML stream.
+
+    An explicit encoding overrides the document's XML declaration; it is
+    needed when the bytes were produced by encoding an already-decoded str.
+
+    Each element is yielded once fully parsed and is cleared as soon as the
+    caller moves on, so memory stays bounded regardless of document size.
+    """
+    if HAS_LXML:
+        context = ET.iterparse(stream, events=('end',), tag='document-id',
+                               remove_blank_text=True,
+                               # Expand the document's own entities but never
+                               # load external ones, matching expat; keep
+                               # libxml2's size limits for untrusted input
+                               resolve_entities='internal', no_network=True,
+                               encoding=encoding)
+        for _, elem in context:
+            yield elem
+            elem.clear(keep_tail=True)
+            # Drop finished siblings of the element and of each enclosing
+            # element (e.g. earlier application-references), which are
+            # otherwise left behind as empty shells. Stop below the root: its
+            # "previous siblings" are top-level comments and PIs
+            node = elem
+            while node.getparent() is not None:
+                while node.getprevious() is not None:
+                    del node.getparent()[0]
+                node = node.getparent()
+    else:
+        # Track open elements so each finished subtree can be detached from
+        # its parent, except inside a <document-id> whose children are still
+        # needed. iterparse reads ahead, so later siblings may already be
+        # attached; the finished element is the parent's first remaining
+        # child (earlier ones were removed), which keeps remove() cheap
+        if encoding is None:
+            context = ET.iterparse(stream, events=('start', 'end'))
+        else:
+            # iterparse's parser argument is deprecated, but it's the only
+            # public way to override the declared encoding, so it is only
+            # used for str input (which must be read as UTF-8)
+            context = ET.iterparse(stream, events=('start', 'end'),
+                                   parser=ET.XMLParser(encoding=encoding))
+        open_elems = []
+        doc_id_depth = 0
+        for event, elem in context:
+            if event == 'start':
+                open_elems.append(elem)
+                if elem.tag == 'document-id':
+                    doc_id_depth += 1
+                continue
+
+            open_elems.pop()
+            if elem.tag == 'document-id':
+                doc_id_depth -= 1
+                yield elem
+            if not doc_id_depth and open_elems:
+                open_elems[-1].remove(elem)
+
+
+def _extract_buckets(doc_ids: Iterable, limit: Optional[int] = None) -> List[List[str]]:
+    """
+    Classify doc-numbers into one list per priority, in document order.
+
+    Stops consuming doc_ids once the priority 1 list holds limit entries,
+    since nothing later in the document can outrank them.
+    """
+    buckets: List[List[str]] = [[], [], [], []]
+    priority_1 = buckets[0]
+    # Bind loop-invariant lookups to locals for the hot loop
+    appends = (None,) + tuple(bucket.append for bucket in buckets)
+    cached_priority = _PRIORITY_CACHE.get
+    doc_number_text = _DOC_NUMBER_TEXT
+
+    for doc_id in doc_ids:
+        if doc_number_text is not None:
+            texts = doc_number_text(doc_id)
+            doc_number = texts[0] if texts else None
+        else:
+            doc_num_elem = doc_id.find('doc-number')
+            doc_number = doc_num_elem.text if doc_num_elem is not None else None
+        if not doc_number:
+            continue
+
+        # Only strip (and allocate a new string) when there is whitespace to trim
+        if doc_number[0].isspace() or doc_number[-1].isspace():
+            doc_number = doc_number.strip()
+            if not doc_number:
+                continue
+
+        attrs = (doc_id.get('format'), doc_id.get('load-source'))
+        priority = cached_priority(attrs)
+        if priority is None:
+            priority = _get_priority(*attrs)
+            if len(_PRIORITY_CACHE) < _PRIORITY_CACHE_MAX_SIZE:
+                _PRIORITY_CACHE[attrs] = priority
+
+        appends[priority](doc_number)
+        if priority == 1 and len(priority_1) == limit:
+            break
+
+    return buckets
+
+
+def extract_doc_numbers(source: Union[str, bytes, Path],
+                        limit: Optional[int] = None,
+                        intern: bool = False) -> List[str]:
     """
     Extract doc-number values from patent XML in priority order.
 
+    With a limit, parsing stops as soon as limit priority 1 doc-numbers have
+    been found. If there are fewer than that, the whole document still has to
+    be read to order the lower priorities.
+
     Args:
-        source: File path or XML content string
+        source: File path, or XML content as a string or bytes
+        limit: Maximum number of doc-numbers to return (non-negative)
+        intern: Intern the returned strings with sys.intern, so repeated
+            doc-numbers share one object and compare by identity
 
     Returns:
         List of doc-number values ordered by priority
@@ -78,47 +251,79 @@ def extract_doc_numbers(source: Union[str, Path]) -> List[str]:
     Raises:
         FileReadError: If file cannot be read
         XMLParsingError: If XML is malformed
+        ValueError: If limit is negative
     """
-    # Read XML content
-    source_str = str(source)
-    path = Path(source_str)
-
-    if source_str.strip().startswith('<'):
-        xml_content = source_str
+    if limit is not None:
+        if limit < 0:
+            raise ValueError(f"limit must be non-negative, got {limit}")
+        if limit == 0:
+            return []
+
+    # Open XML content as a binary stream. Strings are already decoded, so
+    # their re-encoded bytes must be read as UTF-8 whatever they declare
+    encoding = None
+    if isinstance(source, bytes):
+        stream = io.BytesIO(source)
+    elif isinstance(source, str) and _XML_START.match(source):
+        stream = io.BytesIO(source.encode('utf-8'))
+        encoding = 'utf-8'
     else:
         try:
-            xml_content = path.read_text(encoding='utf-8')
-            logger.info(f"Read file: {source}")
-        except Exception as e:
+            # os.fspath rejects ints, which open() would treat as a file descriptor
+            stream = open(os.fspath(source), 'rb', buffering=READ_BUFFER_SIZE)
+            logger.info(f"Reading file: {source}")
+        except (OSError, TypeError, ValueError) as e:
             raise FileReadError(f"Failed to read {source}, input must either be a file which exists or an XML string starting with '<': {e}") from e
 
-    # Parse XML
-    try:
-        root = ET.fromstring(xml_content)
-    except ET.ParseError as e:
-        raise XMLParsingError(f"Invalid XML: {e}") from e
+    with stream:
+        try:
+            buckets = _extract_buckets(_iter_document_ids(stream, encoding), limit)
+        except (ET.ParseError, LookupError) as e:
+            # LookupError: the stdlib parser doesn't know the declared encoding
+            raise XMLParsingError(f"Invalid XML: {e}") from e
 
-    # Extract doc-numbers with priorities
-    entries: List[Tuple[int, str]] = []  # (priority, doc_number)
+    doc_numbers = buckets[0] + buckets[1] + buckets[2] + buckets[3]
+    if limit is not None:
+        del doc_numbers[limit:]
+    if intern:
+        doc_numbers = list(map(sys.intern, doc_numbers))
+    return doc_numbers
 
-    for doc_id in root.findall('.//document-id'):
-        format_attr = doc_id.get('format', '').lower()
-        load_source_attr = doc_id.get('load-source', '').lower()
 
-        doc_num_elem = doc_id.find('doc-number')
-        if doc_num_elem is None or not doc_num_elem.text:
-            continue
+def extract_doc_numbers_many(sources: Iterable[Union[str, bytes, Path]],
+                             workers: Optional[int] = None) -> List[List[str]]:
+    """
+    Extract doc-numbers from many patent XML documents.
 
-        doc_number = doc_num_elem.text.strip()
-        if not doc_number:
-            continue
+    With workers=None or 1 the documents are processed in this process. With
+    more workers they are fanned out to a process pool in chunks of up to
+    MANY_CHUNK_SIZE, so each worker handles a whole chunk per round trip.
+
+    Doc-numbers are interned, so values repeated across the batch share a
+    single string object.
+
+    Args:
+        sources: File paths, or XML content as strings or bytes
+        workers: Number of worker processes
+
+    Returns:
+        One list of doc-number values per source, in input order
+
+    Raises:
+        FileReadError: If a file cannot be read
+        XMLParsingError: If a document is malformed
+    """
+    if workers is None or workers <= 1:
+        return [extract_doc_numbers(source, intern=True) for source in sources]
 
-        priority = _get_priority(format_attr, load_source_attr)
-        entries.append((priority, doc_number))
+    # Shrink chunks for small batches so every worker gets a share
+    sources = list(sources)
+    chunksize = max(1, min(MANY_CHUNK_SIZE, len(sources) // workers))
 
-    # Sort by priority and extract doc-numbers
-    entries.sort(key=lambda x: x[0])
-    return [doc_num for _, doc_num in entries]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(extract_doc_numbers, sources, chunksize=chunksize)
+        # Interning doesn't survive pickling, so it is done on this side
+        return [list(map(sys.intern, doc_numbers)) for doc_numbers in results]
 
 
 def main():
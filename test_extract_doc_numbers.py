@@ -7,8 +7,12 @@ Tests verify:
 - Edge cases (empty values, whitespace, missing attributes)
 """
 
+import importlib.util
+import sys
+from pathlib import Path
+
 import pytest
-from extract_doc_numbers import extract_doc_numbers, XMLParsingError, FileReadError
+from extract_doc_numbers import extract_doc_numbers, extract_doc_numbers_many, XMLParsingError, FileReadError
 
 
 class TestPriorityOrdering:
@@ -128,6 +132,24 @@ class TestPriorityOrdering:
         result = extract_doc_numbers(xml)
         assert result == ['TEST']
 
+    def test_mixed_case_attributes(self):
+        """Test mixed-case attribute values match and same-length lookalikes do not."""
+        xml = """
+        <root>
+          <document-id format="EPX" load-source="patent-offics">
+            <doc-number>P4</doc-number>
+          </document-id>
+          <document-id load-source="Patent-Office">
+            <doc-number>P3</doc-number>
+          </document-id>
+          <document-id format="Epo">
+            <doc-number>P2</doc-number>
+          </document-id>
+        </root>
+        """
+        result = extract_doc_numbers(xml)
+        assert result == ['P2', 'P3', 'P4']
+
 
 class TestBasicExtraction:
     """Test basic extraction functionality."""
@@ -145,12 +167,51 @@ class TestBasicExtraction:
         result = extract_doc_numbers(xml)
         assert result == ['12345']
 
+    def test_extract_from_path_object(self):
+        """Test extraction from a pathlib.Path."""
+        result = extract_doc_numbers(Path('sample_patent.xml'))
+        assert result == ['999000888', '66667777']
+
+    def test_extract_from_bytes(self):
+        """Test extraction from XML bytes."""
+        xml = b'<root><document-id format="epo"><doc-number>12345</doc-number></document-id></root>'
+        result = extract_doc_numbers(xml)
+        assert result == ['12345']
+
+    def test_declared_encoding_respected(self, tmp_path):
+        """Test files are decoded using the encoding in their XML declaration."""
+        path = tmp_path / 'latin1.xml'
+        path.write_bytes(
+            '<?xml version="1.0" encoding="ISO-8859-1"?>'
+            '<root><document-id><doc-number>N\u00ba123</doc-number></document-id></root>'
+            .encode('latin-1'))
+        result = extract_doc_numbers(path)
+        assert result == ['N\u00ba123']
+
     def test_no_doc_numbers(self):
         """Test XML with no doc-numbers."""
         xml = '<root><document-id><country>US</country></document-id></root>'
         result = extract_doc_numbers(xml)
         assert result == []
 
+    def test_xml_string_with_encoding_declaration(self):
+        """Test XML string carrying its own encoding declaration."""
+        xml = '<?xml version="1.0" encoding="UTF-8"?><root><document-id><doc-number>12345</doc-number></document-id></root>'
+        result = extract_doc_numbers(xml)
+        assert result == ['12345']
+
+    def test_xml_string_with_non_utf8_encoding_declaration(self):
+        """Test XML strings are read as text, whatever encoding they declare."""
+        xml = '<?xml version="1.0" encoding="ISO-8859-1"?><root><document-id><doc-number>N\u00ba1</doc-number></document-id></root>'
+        result = extract_doc_numbers(xml)
+        assert result == ['N\u00ba1']
+
+    def test_xml_string_with_unknown_encoding_declaration(self):
+        """Test an XML string declaring an unknown encoding still parses."""
+        xml = '<?xml version="1.0" encoding="bogus"?><root><document-id><doc-number>N\u00ba1</doc-number></document-id></root>'
+        result = extract_doc_numbers(xml)
+        assert result == ['N\u00ba1']
+
     def test_empty_xml(self):
         """Test empty XML."""
         xml = '<root></root>'
@@ -189,6 +250,19 @@ class TestEdgeCases:
         result = extract_doc_numbers(xml)
         assert result == ['12345']
 
+    def test_one_sided_whitespace_trimmed(self):
+        """Test whitespace on only one side of a doc-number is trimmed."""
+        xml = """
+        <root>
+          <document-id><doc-number>
+            LEADING</doc-number></document-id>
+          <document-id><doc-number>TRAILING	</doc-number></document-id>
+          <document-id><doc-number>A B</doc-number></document-id>
+        </root>
+        """
+        result = extract_doc_numbers(xml)
+        assert result == ['LEADING', 'TRAILING', 'A B']
+
     def test_missing_attributes(self):
         """Test missing format and load-source attributes."""
         xml = """
@@ -225,6 +299,11 @@ class TestErrorHandling:
         with pytest.raises(XMLParsingError):
             extract_doc_numbers(xml)
 
+    def test_malformed_xml_file(self):
+        """Test malformed XML file raises XMLParsingError."""
+        with pytest.raises(XMLParsingError):
+            extract_doc_numbers('test_data/malformed.xml')
+
     def test_invalid_xml(self):
         """Test invalid XML content."""
         with pytest.raises(FileReadError, match="No such file or directory"):
@@ -235,6 +314,11 @@ class TestErrorHandling:
         with pytest.raises(FileReadError, match="No such file or directory"):
             extract_doc_numbers('nonexistent.xml')
 
+    def test_non_path_source(self):
+        """Test a non-path source raises FileReadError instead of being used as a file descriptor."""
+        with pytest.raises(FileReadError):
+            extract_doc_numbers(0)
+
     def test_directory_instead_of_file(self):
         """Test directory path raises FileReadError."""
         with pytest.raises(FileReadError):
@@ -309,5 +393,139 @@ class TestComplexScenarios:
         assert result == ['999000888', '66667777']
 
 
+class TestLimit:
+    """Test capping the number of returned doc-numbers."""
+
+    XML = """
+    <root>
+      <document-id format="other"><doc-number>P4</doc-number></document-id>
+      <document-id format="epo" load-source="patent-office"><doc-number>P1-1</doc-number></document-id>
+      <document-id format="epo"><doc-number>P2</doc-number></document-id>
+      <document-id format="epo" load-source="patent-office"><doc-number>P1-2</doc-number></document-id>
+    </root>
+    """
+
+    def test_limit_within_priority_1(self):
+        """Test a limit met by priority 1 alone."""
+        assert extract_doc_numbers(self.XML, limit=1) == ['P1-1']
+
+    def test_limit_spanning_priorities(self):
+        """Test a limit that needs lower priorities keeps priority order."""
+        assert extract_doc_numbers(self.XML, limit=3) == ['P1-1', 'P1-2', 'P2']
+
+    def test_limit_larger_than_result(self):
+        """Test a limit larger than the number of doc-numbers."""
+        assert extract_doc_numbers(self.XML, limit=10) == ['P1-1', 'P1-2', 'P2', 'P4']
+
+    def test_limit_zero(self):
+        """Test a zero limit returns nothing without reading the source."""
+        assert extract_doc_numbers('nonexistent.xml', limit=0) == []
+
+    def test_negative_limit(self):
+        """Test a negative limit is rejected."""
+        with pytest.raises(ValueError):
+            extract_doc_numbers(self.XML, limit=-1)
+
+    def test_limit_stops_before_malformed_tail(self):
+        """Test parsing stops once enough priority 1 doc-numbers are found."""
+        xml = """
+        <root>
+          <document-id format="epo" load-source="patent-office"><doc-number>P1</doc-number></document-id>
+          <document-id><doc-number>UNCLOSED</document-id>
+        """
+        assert extract_doc_numbers(xml, limit=1) == ['P1']
+
+
+class TestBatchExtraction:
+    """Test extracting from many documents at once."""
+
+    SOURCES = [
+        'sample_patent.xml',
+        'test_data/all_priorities.xml',
+        '<root><document-id><doc-number>INLINE</doc-number></document-id></root>',
+    ]
+    EXPECTED = [
+        ['999000888', '66667777'],
+        ['111111', '222222', '333333', '444444'],
+        ['INLINE'],
+    ]
+
+    def test_sequential(self):
+        """Test batch extraction in the current process."""
+        assert extract_doc_numbers_many(self.SOURCES) == self.EXPECTED
+
+    def test_process_pool(self):
+        """Test batch extraction across worker processes preserves input order."""
+        assert extract_doc_numbers_many(self.SOURCES, workers=2) == self.EXPECTED
+
+    def test_results_interned(self):
+        """Test doc-numbers repeated across documents share one string object."""
+        xml = '<root><document-id><doc-number>  SHARED-123  </doc-number></document-id></root>'
+        first, second = extract_doc_numbers_many([xml, xml])
+        assert first[0] is second[0]
+
+    def test_error_propagates(self):
+        """Test a failing document raises from the batch call."""
+        with pytest.raises(XMLParsingError):
+            extract_doc_numbers_many(['sample_patent.xml', 'test_data/malformed.xml'])
+
+
+@pytest.fixture(params=['lxml', 'stdlib'])
+def backend(request, monkeypatch):
+    """A fresh copy of the module loaded against each XML backend."""
+    if request.param == 'lxml':
+        pytest.importorskip('lxml')
+    else:
+        monkeypatch.setitem(sys.modules, 'lxml', None)
+    spec = importlib.util.spec_from_file_location(
+        f'extract_doc_numbers_{request.param}',
+        Path(__file__).parent / 'extract_doc_numbers.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestBackends:
+    """Test lxml and the standard library parser give the same results."""
+
+    def test_internal_entities_expanded(self, backend):
+        """Test entities declared in the document's own DTD are expanded."""
+        xml = """<!DOCTYPE root [<!ENTITY e "XYZ">]>
+        <root>
+          <document-id><doc-number>1&e;2</doc-number></document-id>
+          <document-id><doc-number>&e;</doc-number></document-id>
+        </root>
+        """
+        assert backend.extract_doc_numbers(xml) == ['1XYZ2', 'XYZ']
+
+    def test_external_entities_rejected(self, backend, tmp_path):
+        """Test external entities raise XMLParsingError instead of being loaded."""
+        secret = tmp_path / 'secret.txt'
+        secret.write_text('SECRET')
+        xml = (f'<!DOCTYPE root [<!ENTITY x SYSTEM "{secret.as_uri()}">]>'
+               '<root><document-id><doc-number>A&x;</doc-number></document-id></root>')
+        with pytest.raises(backend.XMLParsingError):
+            backend.extract_doc_numbers(xml)
+
+    def test_text_after_child_element_ignored(self, backend):
+        """Test only text before a doc-number's first child counts, as with .text."""
+        xml = """
+        <root>
+          <document-id><doc-number><b>x</b>123</doc-number></document-id>
+          <document-id><doc-number>456<b>x</b>789</doc-number></document-id>
+        </root>
+        """
+        assert backend.extract_doc_numbers(xml) == ['456']
+
+    @pytest.mark.parametrize('prolog', [
+        '<?xml-stylesheet href="patent.xsl"?>',
+        '<!-- exported patent record -->',
+    ])
+    def test_top_level_node_before_root(self, backend, prolog):
+        """Test a processing instruction or comment before the root element."""
+        xml = prolog + '<root><document-id><doc-number>A</doc-number></document-id></root>'
+        assert backend.extract_doc_numbers(xml) == ['A']
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])